@@ -2,44 +2,115 @@
 import streamlit as st
 import sqlite3
 import json
+import csv
+import re
+import zlib
 from datetime import datetime, date
-from PIL import Image
 import numpy as np
 import cv2
-from pyzbar.pyzbar import decode
-import qrcode
+from pyzbar.pyzbar import decode, Rect
 import io
-import pandas as pd
 import zipfile
 import tempfile
 import os
+import stat
 from typing import List, Dict, Any, Optional
 import base64
 from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import functools
 import hashlib
+import xxhash
 
 # ==================== DATABASE SETUP ====================
+# SQLite database file shared by every session of the app
+DB_PATH = "qr_scans.db"
+
+# Bumped whenever init_db gains a migration for existing databases
+SCHEMA_VERSION = 7
+
+# Columns returned by list queries; full payloads come from get_scan and
+# get_scan_payloads
+_LIST_COLS = "id, filename, qr_type, scan_date, data_preview, is_favorite, created_at"
+
+def hash_qr_data(qr_data: str) -> str:
+    """Hash QR content for duplicate detection (non-cryptographic)"""
+    return xxhash.xxh3_128_hexdigest(qr_data.encode())
+
+# Settings page widget keys and their defaults
+DEFAULT_SETTINGS = {
+    "use_enhanced_detection": True,
+    "auto_rotate": True,
+    "denoise": True,
+    "conf": 0.7,
+    "theme": "Light",
+    "per_page": 25,
+}
+
+# Database files already switched to WAL by this process. journal_mode is
+# persisted in the file, so it only needs setting once per path.
+_pragmas_applied = set()
+
 class QRDatabase:
     """SQLite database manager for QR Scanner"""
     
-    def __init__(self, db_path: str = "qr_scans.db"):
+    def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
+        
+        # One long-lived connection per instance keeps SQLite's page and
+        # statement caches warm across Streamlit reruns
+        self._conn = sqlite3.connect(db_path, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        if db_path not in _pragmas_applied:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            _pragmas_applied.add(db_path)
+        self._conn.executescript('''
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-64000;
+            PRAGMA mmap_size=268435456;
+        ''')
+        
+        # Serializes transactions on the shared connection; re-entrant so
+        # helpers can be called from inside an open transaction
+        self._lock = threading.RLock()
+        
+        # Optional callback run after a committed write that changes what
+        # scan lists show (new, favorited, re-tagged or deleted scans)
+        self.on_scans_changed = None
+        
         self.init_db()
     
     @contextmanager
-    def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-        try:
-            yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            st.error(f"Database error: {str(e)}")
-            raise e
-        finally:
-            conn.close()
+    def get_connection(self, immediate: bool = False):
+        """Context manager for a transaction on the shared connection
+        
+        Pass ``immediate=True`` to take the write lock up front with
+        ``BEGIN IMMEDIATE`` (bulk write paths). Nested calls join the
+        transaction that is already open.
+        """
+        with self._lock:
+            conn = self._conn
+            if conn.in_transaction:
+                yield conn
+                return
+            
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                st.error(f"Database error: {str(e)}")
+                raise e
+    
+    def _scans_changed(self):
+        """Run the on_scans_changed hook, if one is set"""
+        if self.on_scans_changed:
+            self.on_scans_changed()
     
     def init_db(self):
         """Initialize database tables"""
@@ -84,18 +155,32 @@ class QRDatabase:
                 )
             ''')
             
+            # User preferences from the Settings page (JSON-encoded values)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_settings (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            ''')
+            
             # Create indexes
             cursor.execute('''
                 CREATE INDEX IF NOT EXISTS idx_scans_date 
                 ON scans(scan_date DESC)
             ''')
+            # List queries order by (created_at DESC, id DESC) so ties keep
+            # a stable order and LIMIT reads straight off these indexes
             cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_scans_type 
-                ON scans(qr_type)
+                CREATE INDEX IF NOT EXISTS idx_scans_created_id 
+                ON scans(created_at DESC, id DESC)
             ''')
             cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_scans_favorite 
-                ON scans(is_favorite) WHERE is_favorite = 1
+                CREATE INDEX IF NOT EXISTS idx_scans_type_created_id 
+                ON scans(qr_type, created_at DESC, id DESC)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_scans_favorite_created_id 
+                ON scans(created_at DESC, id DESC) WHERE is_favorite = 1
             ''')
             
             # Create a view for common queries
@@ -110,49 +195,203 @@ class QRDatabase:
                 GROUP BY scan_date 
                 ORDER BY scan_date DESC
             ''')
+            
+            self._create_fts(cursor)
+            
+            # Migrate databases created by older versions
+            cursor.execute("PRAGMA user_version")
+            version = cursor.fetchone()[0]
+            
+            if version < 1:
+                # data_hash moved from MD5 to xxh3_128
+                cursor.execute("SELECT id, qr_data FROM scans")
+                rehashed = [(hash_qr_data(row['qr_data']), row['id'])
+                            for row in cursor.fetchall()]
+                cursor.executemany(
+                    "UPDATE scans SET data_hash = ? WHERE id = ?", rehashed
+                )
+            
+            if version < 2:
+                # Index scans saved before scans_fts existed
+                cursor.execute("INSERT INTO scans_fts (scans_fts) VALUES ('rebuild')")
+            
+            if version < 3:
+                # The (qr_type, created_at) index covers plain qr_type lookups too
+                cursor.execute("DROP INDEX IF EXISTS idx_scans_type")
+                
+                # Collect statistics so the planner picks the new indexes
+                cursor.execute("ANALYZE")
+            
+            if version < 4:
+                # The FTS triggers are recreated below
+                cursor.execute("DROP TRIGGER IF EXISTS scans_fts_insert")
+                cursor.execute("DROP TRIGGER IF EXISTS scans_fts_delete")
+                cursor.execute("DROP TRIGGER IF EXISTS scans_fts_update")
+            
+            if version < 5:
+                # Replaced by the *_created_id indexes created above
+                cursor.execute("DROP INDEX IF EXISTS idx_scans_created")
+                cursor.execute("DROP INDEX IF EXISTS idx_scans_type_created")
+                cursor.execute("DROP INDEX IF EXISTS idx_scans_favorite")
+                cursor.execute("ANALYZE")
+            
+            if version < 7:
+                # Versions 4-6 stored large payloads zlib-compressed in
+                # qr_data_z, which made scans_fts keep a second, uncompressed
+                # copy of every payload. Move them back into qr_data and
+                # rebuild scans_fts as an index over the scans table.
+                cursor.execute("DROP TRIGGER IF EXISTS scans_fts_insert")
+                cursor.execute("DROP TRIGGER IF EXISTS scans_fts_delete")
+                cursor.execute("DROP TRIGGER IF EXISTS scans_fts_update")
+                cursor.execute("DROP TABLE IF EXISTS scans_fts")
+                
+                cursor.execute("PRAGMA table_info(scans)")
+                if 'qr_data_z' in [row['name'] for row in cursor.fetchall()]:
+                    cursor.execute(
+                        "SELECT id, qr_data_z FROM scans WHERE qr_data_z IS NOT NULL"
+                    )
+                    cursor.executemany(
+                        "UPDATE scans SET qr_data = ? WHERE id = ?",
+                        [(zlib.decompress(row['qr_data_z']).decode(), row['id'])
+                         for row in cursor.fetchall()]
+                    )
+                    cursor.execute("ALTER TABLE scans DROP COLUMN qr_data_z")
+                
+                self._create_fts(cursor)
+                cursor.execute("INSERT INTO scans_fts (scans_fts) VALUES ('rebuild')")
+            
+            if version < SCHEMA_VERSION:
+                cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            
+            # Keep the index in sync with the scans table
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS scans_fts_insert
+                AFTER INSERT ON scans BEGIN
+                    INSERT INTO scans_fts (rowid, qr_data, filename, tags)
+                    VALUES (new.id, new.qr_data, new.filename, new.tags);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS scans_fts_delete
+                AFTER DELETE ON scans BEGIN
+                    INSERT INTO scans_fts (scans_fts, rowid, qr_data, filename, tags)
+                    VALUES ('delete', old.id, old.qr_data, old.filename, old.tags);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS scans_fts_update
+                AFTER UPDATE OF qr_data, filename, tags ON scans BEGIN
+                    INSERT INTO scans_fts (scans_fts, rowid, qr_data, filename, tags)
+                    VALUES ('delete', old.id, old.qr_data, old.filename, old.tags);
+                    INSERT INTO scans_fts (rowid, qr_data, filename, tags)
+                    VALUES (new.id, new.qr_data, new.filename, new.tags);
+                END
+            ''')
+    
+    def _create_fts(self, cursor):
+        """Create the full-text index used by search_scans"""
+        # External content: the index reads the text from scans rather
+        # than storing a copy. The trigram tokenizer keeps the substring
+        # semantics of the old LIKE '%query%' search.
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS scans_fts USING fts5(
+                qr_data, filename, tags,
+                content='scans', content_rowid='id',
+                tokenize='trigram'
+            )
+        ''')
+    
+    def _scan_params(self, filename: str, qr_data: str, qr_type: str,
+                     file_size_kb: int = None, file_format: str = None) -> tuple:
+        """Build the INSERT parameters for a scan row"""
+        # Generate hash for duplicate detection
+        data_hash = hash_qr_data(qr_data)
+        
+        return (
+            filename, qr_data, qr_type, 
+            (qr_data[:97] + '...' if len(qr_data) > 100 else qr_data),
+            file_size_kb, file_format, data_hash
+        )
     
     def save_scan(self, filename: str, qr_data: str, qr_type: str, 
                   file_size_kb: int = None, file_format: str = None) -> int:
         """Save a new scan to database"""
-        # Generate hash for duplicate detection
-        data_hash = hashlib.md5(qr_data.encode()).hexdigest()
+        params = self._scan_params(filename, qr_data, qr_type,
+                                   file_size_kb, file_format)
         
-        # Check for duplicates
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Check if this exact data already exists
-            cursor.execute(
-                "SELECT id FROM scans WHERE data_hash = ?", 
-                (data_hash,)
-            )
-            existing = cursor.fetchone()
-            
-            if existing:
-                return existing['id']  # Return existing ID
-            
-            # Insert new scan
+            # Insert new scan; duplicates hit the UNIQUE index on data_hash,
+            # insert nothing and return no row
             cursor.execute('''
                 INSERT INTO scans (
                     filename, qr_data, qr_type, data_preview,
                     file_size_kb, file_format, data_hash,
                     scan_date, scan_time
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, DATE('now'), TIME('now'))
-            ''', (
-                filename, qr_data, qr_type, 
-                (qr_data[:97] + '...' if len(qr_data) > 100 else qr_data),
-                file_size_kb, file_format, data_hash
-            ))
-            
-            scan_id = cursor.lastrowid
+                ON CONFLICT(data_hash) DO NOTHING
+                RETURNING id
+            ''', params)
+            row = cursor.fetchone()
+            if row is None:
+                # Return the existing ID; the scan lists are unchanged
+                cursor.execute(
+                    "SELECT id FROM scans WHERE data_hash = ?", (params[-1],)
+                )
+                return cursor.fetchone()[0]
+        
+        self._scans_changed()
+        
+        return row[0]
+    
+    def save_scans_bulk(self, rows: List[Dict]) -> List[int]:
+        """Save many scans in a single transaction
+        
+        Each row holds the keyword arguments of ``save_scan``. Returns the
+        scan ID of every row in order (the existing ID for duplicates).
+        """
+        if not rows:
+            return []
+        
+        params = [self._scan_params(**row) for row in rows]
+        hashes = [p[-1] for p in params]
+        
+        with self.get_connection(immediate=True) as conn:
+            cursor = conn.cursor()
             
-            # Update daily stats
-            self._update_daily_stats()
+            # Duplicates are skipped by the UNIQUE index on data_hash
+            cursor.executemany('''
+                INSERT OR IGNORE INTO scans (
+                    filename, qr_data, qr_type, data_preview,
+                    file_size_kb, file_format, data_hash,
+                    scan_date, scan_time
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, DATE('now'), TIME('now'))
+            ''', params)
+            inserted = cursor.rowcount
             
-            return scan_id
+            # Resolve IDs for new and already existing rows alike; a single
+            # JSON parameter avoids SQLite's bound-variable limit
+            cursor.execute('''
+                SELECT id, data_hash FROM scans 
+                WHERE data_hash IN (SELECT value FROM json_each(?))
+            ''', (json.dumps(list(set(hashes))),))
+            ids = {row['data_hash']: row['id'] for row in cursor.fetchall()}
+        
+        # Update daily stats once for the whole batch
+        self._update_daily_stats()
+        
+        if inserted:
+            self._scans_changed()
+        
+        return [ids[h] for h in hashes]
     
     def _update_daily_stats(self):
-        """Update daily statistics"""
+        """Update daily statistics
+        
+        Re-aggregates all of today's scans, so it is called once per
+        ``save_scans_bulk`` batch rather than per saved scan.
+        """
         today = date.today().isoformat()
         
         with self.get_connection() as conn:
@@ -161,7 +400,6 @@ class QRDatabase:
             # Get today's scans
             cursor.execute('''
                 SELECT 
-                    COUNT(*) as total,
                     COUNT(DISTINCT data_hash) as unique_count,
                     qr_type,
                     COUNT(*) as type_count
@@ -173,8 +411,8 @@ class QRDatabase:
             results = cursor.fetchall()
             
             if results:
-                total = results[0]['total']
-                unique = results[0]['unique_count']
+                total = sum(row['type_count'] for row in results)
+                unique = sum(row['unique_count'] for row in results)
                 
                 # Build type distribution JSON
                 type_counts = {}
@@ -192,21 +430,44 @@ class QRDatabase:
         """Get all scans with pagination"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM scans 
-                ORDER BY created_at DESC 
+            cursor.execute(f'''
+                SELECT {_LIST_COLS} FROM scans 
+                ORDER BY created_at DESC, id DESC 
                 LIMIT ?
             ''', (limit,))
             return [dict(row) for row in cursor.fetchall()]
     
+    def get_scan(self, scan_id: int) -> Optional[Dict]:
+        """Get a single scan with its full content"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM scans WHERE id = ?", (scan_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def get_scan_payloads(self, scan_ids: List[int]) -> Dict[int, str]:
+        """Get the full content of several scans in one query, keyed by id"""
+        if not scan_ids:
+            return {}
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # A single JSON parameter avoids SQLite's bound-variable limit
+            cursor.execute('''
+                SELECT id, qr_data FROM scans 
+                WHERE id IN (SELECT value FROM json_each(?))
+            ''', (json.dumps(scan_ids),))
+            return {row['id']: row['qr_data'] for row in cursor.fetchall()}
+    
     def get_scans_by_type(self, qr_type: str) -> List[Dict]:
         """Get scans filtered by type"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM scans 
+            cursor.execute(f'''
+                SELECT {_LIST_COLS} FROM scans 
                 WHERE qr_type = ? 
-                ORDER BY created_at DESC
+                ORDER BY created_at DESC, id DESC
             ''', (qr_type,))
             return [dict(row) for row in cursor.fetchall()]
     
@@ -214,10 +475,10 @@ class QRDatabase:
         """Get favorite scans"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM scans 
+            cursor.execute(f'''
+                SELECT {_LIST_COLS} FROM scans 
                 WHERE is_favorite = 1 
-                ORDER BY created_at DESC
+                ORDER BY created_at DESC, id DESC
             ''')
             return [dict(row) for row in cursor.fetchall()]
     
@@ -233,15 +494,18 @@ class QRDatabase:
             )
             result = cursor.fetchone()
             
-            if result:
-                new_state = 0 if result['is_favorite'] else 1
-                cursor.execute('''
-                    UPDATE scans 
-                    SET is_favorite = ? 
-                    WHERE id = ?
-                ''', (new_state, scan_id))
-                return new_state == 1
-            return False
+            if not result:
+                return False
+            
+            new_state = 0 if result['is_favorite'] else 1
+            cursor.execute('''
+                UPDATE scans 
+                SET is_favorite = ? 
+                WHERE id = ?
+            ''', (new_state, scan_id))
+        
+        self._scans_changed()
+        return new_state == 1
     
     def update_tags(self, scan_id: int, tags: List[str]):
         """Update tags for a scan"""
@@ -252,6 +516,8 @@ class QRDatabase:
                 SET tags = ? 
                 WHERE id = ?
             ''', (json.dumps(tags), scan_id))
+        
+        self._scans_changed()
     
     def update_notes(self, scan_id: int, notes: str):
         """Update notes for a scan"""
@@ -263,107 +529,285 @@ class QRDatabase:
                 WHERE id = ?
             ''', (notes, scan_id))
     
+    def get_settings(self) -> Dict[str, Any]:
+        """Get saved user settings"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT key, value FROM user_settings")
+            return {row['key']: json.loads(row['value']) for row in cursor.fetchall()}
+    
+    def save_settings(self, settings: Dict[str, Any]):
+        """Save user settings, replacing existing values"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT OR REPLACE INTO user_settings (key, value)
+                VALUES (?, ?)
+            ''', [(key, json.dumps(value)) for key, value in settings.items()])
+    
     def delete_scan(self, scan_id: int) -> bool:
         """Delete a scan"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM scans WHERE id = ?", (scan_id,))
-            return cursor.rowcount > 0
+            deleted = cursor.rowcount > 0
+        
+        if deleted:
+            self._scans_changed()
+        return deleted
+    
+    def clear_all(self):
+        """Delete all scans and statistics and release the disk space"""
+        # Everything below commits as a single transaction. executescript()
+        # would COMMIT the open transaction first, so plain execute() is used
+        with self.get_connection(immediate=True) as conn:
+            # Keep the AUTOINCREMENT counter so scan IDs are never reused
+            sequence = conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'scans'"
+            ).fetchone()
+            
+            # The FTS triggers on scans rule out SQLite's truncate
+            # optimization for DELETE, so drop the table and recreate it
+            conn.execute("DROP TABLE scans")
+            conn.execute("INSERT INTO scans_fts (scans_fts) VALUES ('delete-all')")
+            conn.execute("DELETE FROM daily_stats")
+            self.init_db()
+            
+            if sequence:
+                conn.execute(
+                    "INSERT INTO sqlite_sequence (name, seq) VALUES ('scans', ?)",
+                    (sequence['seq'],)
+                )
+        
+        # VACUUM cannot run inside a transaction
+        with self._lock:
+            self._conn.execute("VACUUM")
+        
+        self._scans_changed()
     
     def search_scans(self, query: str) -> List[Dict]:
         """Search scans by content"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            search_term = f"%{query}%"
-            cursor.execute('''
-                SELECT * FROM scans 
-                WHERE qr_data LIKE ? 
-                   OR filename LIKE ? 
-                   OR tags LIKE ?
-                ORDER BY created_at DESC
-            ''', (search_term, search_term, search_term))
+            
+            # Trigrams need at least 3 characters; shorter queries fall
+            # back to a plain LIKE scan. Escape LIKE's wildcards so the
+            # query matches literally, as the FTS phrase below does.
+            if len(query) < 3:
+                escaped = re.sub(r'([\\%_])', r'\\\1', query)
+                search_term = f"%{escaped}%"
+                cursor.execute(f'''
+                    SELECT {_LIST_COLS} FROM scans
+                    WHERE qr_data LIKE ? ESCAPE '\\'
+                       OR filename LIKE ? ESCAPE '\\'
+                       OR tags LIKE ? ESCAPE '\\'
+                    ORDER BY created_at DESC, id DESC
+                ''', (search_term, search_term, search_term))
+                return [dict(row) for row in cursor.fetchall()]
+            
+            # Quote the query as an FTS5 phrase so user input is matched
+            # literally rather than parsed as query syntax
+            phrase = '"' + query.replace('"', '""') + '"'
+            cursor.execute(f'''
+                SELECT {_LIST_COLS} FROM scans 
+                WHERE id IN (
+                    SELECT rowid FROM scans_fts WHERE scans_fts MATCH ?
+                ) 
+                ORDER BY created_at DESC, id DESC
+            ''', (phrase,))
             return [dict(row) for row in cursor.fetchall()]
     
     def get_stats(self) -> Dict:
-        """Get overall statistics"""
+        """Get overall statistics (cached until the scans table changes)"""
+        return _compute_stats(self, self.db_path, self._fingerprint())
+    
+    def _fingerprint(self) -> tuple:
+        """Cheap summary of the scans table used as the stats cache key"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            stats = {}
-            
-            # Total scans
-            cursor.execute("SELECT COUNT(*) as total FROM scans")
-            stats['total_scans'] = cursor.fetchone()['total']
-            
-            # Unique scans
-            cursor.execute("SELECT COUNT(DISTINCT data_hash) as unique FROM scans")
-            stats['unique_scans'] = cursor.fetchone()['unique']
-            
-            # By type
+            # AUTOINCREMENT never reuses IDs, so any insert or delete
+            # changes the count or the max ID
             cursor.execute('''
-                SELECT qr_type, COUNT(*) as count 
-                FROM scans 
-                GROUP BY qr_type 
-                ORDER BY count DESC
+                SELECT 
+                    COUNT(*), 
+                    COALESCE(MAX(id), 0),
+                    (SELECT COUNT(*) FROM scans WHERE is_favorite = 1)
+                FROM scans
             ''')
-            stats['by_type'] = dict(cursor.fetchall())
+            return tuple(cursor.fetchone())
+    
+    def _query_stats(self) -> Dict:
+        """Run the statistics query behind get_stats"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
             
-            # Recent activity
+            # All statistics in one round-trip, packed as a JSON object
             cursor.execute('''
-                SELECT scan_date, COUNT(*) as count 
-                FROM scans 
-                GROUP BY scan_date 
-                ORDER BY scan_date DESC 
-                LIMIT 7
+                WITH totals AS (
+                    SELECT 
+                        COUNT(*) as total,
+                        COUNT(DISTINCT data_hash) as unique_count,
+                        COUNT(*) FILTER (WHERE is_favorite = 1) as favorites
+                    FROM scans
+                ),
+                by_type AS (
+                    SELECT qr_type, COUNT(*) as count 
+                    FROM scans 
+                    GROUP BY qr_type 
+                    ORDER BY count DESC
+                ),
+                recent AS (
+                    -- Aggregated on read by the scan_summary view
+                    SELECT scan_date, total_scans 
+                    FROM scan_summary 
+                    ORDER BY scan_date DESC 
+                    LIMIT 7
+                )
+                SELECT json_object(
+                    'total_scans', (SELECT total FROM totals),
+                    'unique_scans', (SELECT unique_count FROM totals),
+                    'by_type', (SELECT json_group_object(qr_type, count) FROM by_type),
+                    'recent_activity', (SELECT json_group_object(scan_date, total_scans) FROM recent),
+                    'favorites', (SELECT favorites FROM totals)
+                )
             ''')
-            stats['recent_activity'] = dict(cursor.fetchall())
             
-            # Favorites count
-            cursor.execute("SELECT COUNT(*) as count FROM scans WHERE is_favorite = 1")
-            stats['favorites'] = cursor.fetchone()['count']
+            return json.loads(cursor.fetchone()[0])
+    
+    def stream_csv(self, batch_size: int = 1000):
+        """Yield all scans as UTF-8 CSV chunks of up to batch_size rows"""
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator='\n')
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM scans")
             
-            return stats
+            writer.writerow(col[0] for col in cursor.description)
+            
+            # Only one batch of rows is held in memory at a time
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                yield buf.getvalue().encode()
+                buf.seek(0)
+                buf.truncate()
+        
+        # Header only, for an empty table
+        if buf.tell():
+            yield buf.getvalue().encode()
     
     def export_to_csv(self) -> str:
         """Export all scans to CSV string"""
+        return b"".join(self.stream_csv()).decode()
+    
+    def stream_json(self, batch_size: int = 1000):
+        """Yield all scans, newest first, as UTF-8 JSON chunks"""
+        buf = io.StringIO()
+        buf.write('[')
+        count = 0
+        
         with self.get_connection() as conn:
-            df = pd.read_sql_query("SELECT * FROM scans", conn)
-            return df.to_csv(index=False)
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM scans ORDER BY created_at DESC, id DESC")
+            
+            # Encode one row at a time, matching json.dumps(rows, indent=2)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    item = json.dumps(dict(row), indent=2, default=str)
+                    buf.write(',\n  ' if count else '\n  ')
+                    buf.write(item.replace('\n', '\n  '))
+                    count += 1
+                yield buf.getvalue().encode()
+                buf.seek(0)
+                buf.truncate()
+        
+        buf.write('\n]' if count else ']')
+        yield buf.getvalue().encode()
     
     def export_to_json(self) -> str:
         """Export all scans to JSON string"""
-        scans = self.get_all_scans(limit=1000)
-        return json.dumps(scans, indent=2, default=str)
+        return b"".join(self.stream_json()).decode()
+
+@st.cache_resource
+def get_db() -> QRDatabase:
+    """Database shared by all sessions for the life of the server"""
+    db = QRDatabase(DB_PATH)
+    db.on_scans_changed = _query_scans.clear
+    return db
+
+@st.cache_data(ttl=60)
+def _compute_stats(_db: QRDatabase, db_path: str, fingerprint: tuple) -> Dict:
+    """Cached get_stats result, keyed on the scans table fingerprint"""
+    return _db._query_stats()
+
+@st.cache_data(ttl=30, max_entries=64)
+def _query_scans(_db: QRDatabase, db_path: str, filters: tuple, 
+                 limit: int) -> List[Dict]:
+    """Cached Browse page query for a (search, type, favorites) filter tuple"""
+    search_query, filter_type, show_favorites = filters
+    
+    if search_query:
+        return _db.search_scans(search_query)
+    elif filter_type != "All":
+        return _db.get_scans_by_type(filter_type)
+    elif show_favorites:
+        return _db.get_favorites()
+    else:
+        return _db.get_all_scans(limit=limit)
 
 # ==================== QR SCANNER FUNCTIONS ====================
+# Longest side (px) images are downscaled to before decoding
+MAX_SCAN_DIMENSION = 1600
+
+# Content type prefixes, matched in a single pass
+_PREFIX_RE = re.compile(
+    r'(?P<url>https?://|www\.)|(?P<wifi>WIFI:)|(?P<vcard>BEGIN:VCARD)'
+    r'|(?P<phone>tel:)|(?P<sms>SMSTO:)|(?P<crypto>BITCOIN:)'
+)
+_MAILTO_RE = re.compile(r'mailto:', re.IGNORECASE)
+_DOT_COM_RE = re.compile(r'\.com', re.IGNORECASE)
+
+# OpenCV's WeChat QR detector (opencv-contrib) is tried before pyzbar.
+# Without its optional CNN model files it falls back to classic detection.
+# Detectors hold internal state, so each scanning thread gets its own.
+_wechat_local = threading.local()
+
+def _get_wechat_detector():
+    """Return this thread's WeChat QR detector, or None if unavailable"""
+    if not hasattr(_wechat_local, 'detector'):
+        try:
+            _wechat_local.detector = cv2.wechat_qrcode_WeChatQRCode()
+        except (AttributeError, cv2.error):
+            _wechat_local.detector = None
+    return _wechat_local.detector
+
 def detect_content_type(data: str) -> str:
     """Detect type of QR code content"""
-    data_lower = data.lower()
-    
-    if data.startswith(('http://', 'https://', 'www.')):
-        return 'url'
-    elif data.startswith('WIFI:'):
-        return 'wifi'
-    elif data.startswith('BEGIN:VCARD'):
-        return 'vcard'
-    elif 'mailto:' in data_lower or '@' in data_lower and '.com' in data_lower:
+    match = _PREFIX_RE.match(data)
+    kind = match.lastgroup if match else None
+    
+    if kind in ('url', 'wifi', 'vcard'):
+        return kind
+    elif _MAILTO_RE.search(data) or ('@' in data and _DOT_COM_RE.search(data)):
         return 'email'
-    elif data.startswith('tel:'):
-        return 'phone'
-    elif data.startswith('SMSTO:'):
-        return 'sms'
-    elif data.startswith('BITCOIN:'):
-        return 'crypto'
+    elif kind:  # phone, sms, crypto
+        return kind
     elif data.replace('.', '', 1).isdigit():
         return 'numeric'
-    elif len(data.split()) > 3:  # Multiple words
-        return 'text'
     else:
         return 'text'
 
-def parse_wifi_string(wifi_string: str) -> Dict:
-    """Parse WiFi connection string"""
-    result = {'ssid': 'Unknown', 'password': None, 'security': 'WPA'}
+@functools.lru_cache(maxsize=512)
+def _parse_wifi_fields(wifi_string: str) -> tuple:
+    """Parse WiFi connection string into (ssid, password, security)"""
+    ssid, password, security = 'Unknown', None, 'WPA'
     
     try:
         parts = wifi_string[5:].split(';')
@@ -371,73 +815,117 @@ def parse_wifi_string(wifi_string: str) -> Dict:
             if ':' in part:
                 key, value = part.split(':', 1)
                 if key == 'S':
-                    result['ssid'] = value
+                    ssid = value
                 elif key == 'T':
-                    result['security'] = value
+                    security = value
                 elif key == 'P':
-                    result['password'] = value
+                    password = value
     except:
         pass
     
-    return result
+    return ssid, password, security
 
-def enhance_image_for_scanning(image_np):
-    """Apply image processing to improve QR detection"""
-    if len(image_np.shape) == 3:
-        gray = cv2.cvtColor(image_np, cv2.COLOR_RGB2GRAY)
-    else:
-        gray = image_np.copy()
-    
-    # Multiple enhancement strategies
-    enhanced_images = []
-    
-    # Strategy 1: Adaptive threshold
-    thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                  cv2.THRESH_BINARY, 11, 2)
-    enhanced_images.append(thresh)
+def parse_wifi_string(wifi_string: str) -> Dict:
+    """Parse WiFi connection string"""
+    # The cached parse is an immutable tuple; callers get a fresh dict
+    ssid, password, security = _parse_wifi_fields(wifi_string)
+    return {'ssid': ssid, 'password': password, 'security': security}
+
+def enhance_image_for_scanning(gray):
+    """Yield processed variants of a grayscale image to improve QR detection
     
-    # Strategy 2: Otsu threshold
+    Variants are produced lazily, cheapest and most effective first, so
+    callers that stop at the first successful decode skip the rest.
+    """
+    # Strategy 1: Otsu threshold
     _, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    enhanced_images.append(otsu)
+    yield otsu
+    
+    # Strategy 2: Adaptive threshold
+    yield cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                                cv2.THRESH_BINARY, 11, 2)
     
     # Strategy 3: Equalize histogram
-    equalized = cv2.equalizeHist(gray)
-    enhanced_images.append(equalized)
+    yield cv2.equalizeHist(gray)
     
     # Strategy 4: Denoising
-    denoised = cv2.medianBlur(gray, 3)
-    enhanced_images.append(denoised)
+    yield cv2.medianBlur(gray, 3)
+
+def decode_with_wechat(image_np) -> list:
+    """Decode with OpenCV's WeChat QR detector as (text, rect) pairs"""
+    detector = _get_wechat_detector()
+    if detector is None:
+        return []
+    
+    try:
+        texts, points = detector.detectAndDecode(image_np)
+    except cv2.error:
+        return []
     
-    return enhanced_images
+    return [
+        (text, Rect(*cv2.boundingRect(np.asarray(corners, dtype=np.float32))))
+        for text, corners in zip(texts, points) if text
+    ]
+
+def decode_with_enhancements(gray) -> list:
+    """Decode an image as-is, then through the enhanced variants"""
+    # Try original image first
+    decoded_objects = decode(gray)
+    
+    # If no detection, try enhanced versions
+    if not decoded_objects:
+        for enhanced in enhance_image_for_scanning(gray):
+            decoded_objects = decode(enhanced)
+            if decoded_objects:
+                break
+    
+    return [
+        (obj.data.decode("utf-8", errors='ignore'), getattr(obj, 'rect', None))
+        for obj in decoded_objects
+    ]
+
+def decode_qr_codes(image_np) -> list:
+    """Decode QR codes as (text, rect) pairs, fast path first"""
+    return decode_with_wechat(image_np) or decode_with_enhancements(image_np)
 
 def scan_qr_from_image(image) -> List[Dict]:
     """Scan QR codes from image with multiple strategies"""
     results = []
     detected_texts = set()
     
-    # Convert to numpy array
+    from PIL import Image
+    
+    # Convert to a grayscale numpy array once; every decoder and
+    # enhancement works on it
     if isinstance(image, Image.Image):
-        image_np = np.array(image)
+        image_np = np.array(image.convert('L'))
     else:
-        image_np = image.copy()
+        image_np = image
     
-    # Try original image first
-    decoded_objects = decode(image_np)
+    if image_np.ndim == 3:
+        code = cv2.COLOR_RGBA2GRAY if image_np.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+        image_np = cv2.cvtColor(image_np, code)
     
-    # If no detection, try enhanced versions
-    if not decoded_objects:
-        enhanced_images = enhance_image_for_scanning(image_np)
+    # Large photos decode just as reliably at a lower resolution, at a
+    # fraction of the cost
+    scale = 1.0
+    longest_side = max(image_np.shape[:2])
+    if longest_side > MAX_SCAN_DIMENSION:
+        scale = MAX_SCAN_DIMENSION / longest_side
+        decoded = decode_qr_codes(cv2.resize(
+            image_np, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+        ))
         
-        for enhanced in enhanced_images:
-            decoded_objects = decode(enhanced)
-            if decoded_objects:
-                break
+        # Fall back to full resolution only if the downscaled pass failed
+        if not decoded:
+            scale = 1.0
+            decoded = decode_qr_codes(image_np)
+    else:
+        decoded = decode_qr_codes(image_np)
     
     # Process results
-    for obj in decoded_objects:
+    for data, rect in decoded:
         try:
-            data = obj.data.decode("utf-8", errors='ignore')
-            
             # Skip duplicates in same image
             if data in detected_texts:
                 continue
@@ -445,10 +933,15 @@ def scan_qr_from_image(image) -> List[Dict]:
             
             qr_type = detect_content_type(data)
             
+            # Map bounds back to the coordinates of the original image
+            bounds = None
+            if rect is not None:
+                bounds = Rect(*(round(v / scale) for v in rect))
+            
             result = {
                 'data': data,
                 'type': qr_type,
-                'bounds': obj.rect if hasattr(obj, 'rect') else None,
+                'bounds': bounds,
                 'timestamp': datetime.now().isoformat()
             }
             results.append(result)
@@ -458,31 +951,201 @@ def scan_qr_from_image(image) -> List[Dict]:
     
     return results
 
-def generate_qr_code(data: str, size: int = 300):
-    """Generate QR code from text"""
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(data)
-    qr.make(fit=True)
+def load_image_gray(data: bytes):
+    """Decode an encoded image file straight to a grayscale array"""
+    gray = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+    
+    # OpenCV cannot read every format the uploader accepts (e.g. GIF)
+    if gray is None:
+        from PIL import Image
+        gray = np.array(Image.open(io.BytesIO(data)).convert('L'))
+    
+    return gray
+
+def scan_images_parallel(images: List[bytes]) -> List[List[Dict]]:
+    """Scan several encoded images concurrently, results in input order
+    
+    pyzbar and OpenCV release the GIL while decoding, so threads scale
+    with the number of cores.
+    """
+    if not images:
+        return []
+    
+    def scan_bytes(data: bytes) -> List[Dict]:
+        return scan_qr_from_image(load_image_gray(data))
+    
+    workers = min(len(images), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(scan_bytes, images))
+
+# Encoder settings shared by the PNG and in-browser QR renderers
+QR_ERROR = 'm'
+QR_BORDER = 2
+
+# On-disk PNG cache shared across server restarts (least recently used
+# files are evicted once it grows past QR_CACHE_MAX_FILES). The directory
+# is per user; bump QR_CACHE_VERSION whenever the PNG output changes.
+QR_CACHE_DIR = os.path.join(
+    tempfile.gettempdir(),
+    f"qrcache-{os.getuid()}" if hasattr(os, 'getuid') else "qrcache"
+)
+QR_CACHE_VERSION = 1
+QR_CACHE_MAX_FILES = 1000
+QR_CACHE_EVICT_EVERY = 100
+
+_qr_cache_lock = threading.Lock()
+_qr_cache_writes = 0
+
+def _qr_cache_usable() -> bool:
+    """Create the cache directory and check that only this user can write it
+    
+    Files planted in a directory another local user controls would be
+    served as QR images, so the cache is skipped in that case.
+    """
+    try:
+        os.makedirs(QR_CACHE_DIR, mode=0o700, exist_ok=True)
+        info = os.lstat(QR_CACHE_DIR)
+    except OSError:
+        return False
+    
+    if not stat.S_ISDIR(info.st_mode):
+        return False
+    if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+        return False
+    return not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+def _read_qr_cache(path: str) -> Optional[bytes]:
+    """Read a cached PNG and mark it as recently used"""
+    try:
+        with open(path, 'rb') as f:
+            png = f.read()
+        os.utime(path)
+        return png
+    except OSError:
+        return None
+
+def _write_qr_cache(path: str, png: bytes):
+    """Atomically store a PNG, evicting old entries every few writes"""
+    global _qr_cache_writes
+    
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=QR_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+    except OSError:
+        return  # The cache is best-effort
+    
+    with _qr_cache_lock:
+        _qr_cache_writes += 1
+        if _qr_cache_writes % QR_CACHE_EVICT_EVERY == 0:
+            _evict_qr_cache()
+
+def _evict_qr_cache():
+    """Delete the least recently used PNGs beyond QR_CACHE_MAX_FILES"""
+    entries = []
+    for entry in os.scandir(QR_CACHE_DIR):
+        if entry.name.endswith('.png'):
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                pass
+    
+    entries.sort(reverse=True)
+    for _, path in entries[QR_CACHE_MAX_FILES:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+@st.cache_data(max_entries=512, ttl=3600, show_spinner=False)
+def generate_qr_code(data: str, size: int = 300) -> bytes:
+    """Generate QR code PNG bytes from text (cached per data and size)"""
+    # The key covers everything that shapes the PNG, not just the payload
+    cache_key = hashlib.sha1(
+        f"v{QR_CACHE_VERSION}:{QR_ERROR}:{QR_BORDER}:{size}:{data}".encode()
+    ).hexdigest()
+    cache_path = os.path.join(QR_CACHE_DIR, f"{cache_key}.png")
+    use_cache = _qr_cache_usable()
+    
+    if use_cache:
+        png = _read_qr_cache(cache_path)
+        if png is not None:
+            return png
     
-    img = qr.make_image(fill_color="black", back_color="white")
-    img = img.resize((size, size))
+    import segno
+    qr = segno.make(data, error=QR_ERROR, micro=False)
+    
+    # Pick the largest whole-module scale that fits the requested size
+    width, _ = qr.symbol_size(border=QR_BORDER)
     
     buf = io.BytesIO()
-    img.save(buf, format='PNG')
-    buf.seek(0)
+    qr.save(buf, kind='png', scale=max(1, size // width), border=QR_BORDER)
+    
+    png = buf.getvalue()
+    if use_cache:
+        _write_qr_cache(cache_path, png)
     
-    return buf
+    return png
+
+# Longest payload (chars) drawn in the browser instead of sent as a PNG
+CLIENT_QR_MAX_LEN = 2048
+
+# Byte-mode capacity of the largest QR code at error level M. Longer
+# payloads can still fit when segno picks a denser (numeric) mode.
+QR_MAX_BYTES = 2331
+
+@functools.lru_cache(maxsize=512)
+def _qr_fits(data: str) -> bool:
+    """Whether data fits in a single QR code at QR_ERROR"""
+    if len(data.encode()) <= QR_MAX_BYTES:
+        return True
+    
+    import segno
+    try:
+        segno.make(data, error=QR_ERROR, micro=False)
+    except segno.DataOverflowError:
+        return False
+    return True
+
+def _render_qr_client(data: str, size: int = 300):
+    """Draw a QR code preview on a canvas in the browser
+    
+    Only the module matrix is sent; the browser paints it, so no PNG is
+    encoded or transferred and no third-party script is loaded.
+    """
+    import segno
+    qr = segno.make(data, error=QR_ERROR, micro=False)
+    rows = [''.join('1' if module else '0' for module in row)
+            for row in qr.matrix_iter(border=QR_BORDER)]
+    
+    # Escape every "<" so nothing in the JSON can end the script element
+    matrix = json.dumps(rows).replace("<", "\\u003c")
+    st.iframe(f'''
+        <canvas id="qr"></canvas>
+        <script>
+            const rows = {matrix};
+            const scale = Math.max(1, Math.floor({size} / rows.length));
+            const canvas = document.getElementById("qr");
+            canvas.width = canvas.height = rows.length * scale;
+            
+            const ctx = canvas.getContext("2d");
+            ctx.fillStyle = "#fff";
+            ctx.fillRect(0, 0, canvas.width, canvas.height);
+            ctx.fillStyle = "#000";
+            rows.forEach((row, y) => [...row].forEach((bit, x) => {{
+                if (bit === "1") ctx.fillRect(x * scale, y * scale, scale, scale);
+            }}));
+        </script>
+    ''', height=size + 10)
 
 # ==================== STREAMLIT APP ====================
 def init_session_state():
     """Initialize session state variables"""
     if 'db' not in st.session_state:
-        st.session_state.db = QRDatabase()
+        # One instance per server process; it owns the connection
+        # (check_same_thread=False) and the lock that guards it
+        st.session_state.db = get_db()
     if 'scans' not in st.session_state:
         st.session_state.scans = []
     if 'stats' not in st.session_state:
@@ -491,6 +1154,16 @@ def init_session_state():
         st.session_state.selected_tags = []
     if 'search_query' not in st.session_state:
         st.session_state.search_query = ""
+    if 'confirm_delete' not in st.session_state:
+        st.session_state.confirm_delete = False
+    if 'settings' not in st.session_state:
+        st.session_state.settings = {**DEFAULT_SETTINGS,
+                                     **st.session_state.db.get_settings()}
+    
+    # Streamlit drops widget state while the Settings page isn't shown;
+    # re-assigning the keys every run keeps the values alive
+    for key, value in st.session_state.settings.items():
+        st.session_state[key] = st.session_state.get(key, value)
 
 def main():
     """Main Streamlit app"""
@@ -589,6 +1262,19 @@ def main():
     elif page == "⚙️ Settings":
         show_settings_page(db)
 
+def _scan_rows(uploaded_file, results: List[Dict]) -> List[Dict]:
+    """Build save_scans_bulk rows for the QR codes found in an upload"""
+    return [
+        {
+            'filename': uploaded_file.name,
+            'qr_data': result['data'],
+            'qr_type': result['type'],
+            'file_size_kb': uploaded_file.size / 1024,
+            'file_format': uploaded_file.type
+        }
+        for result in results
+    ]
+
 def show_scan_page(db):
     """Show image scanning page"""
     st.title("📤 Scan QR Codes from Images")
@@ -605,15 +1291,36 @@ def show_scan_page(db):
         # Process files
         total_found = 0
         
-        for uploaded_file in uploaded_files:
+        # Scan every image at once; results are saved in one transaction
+        batch = None
+        if st.button("🔍 Scan All Images", type="primary"):
+            with st.spinner(f"Scanning {len(uploaded_files)} image(s)..."):
+                batch_results = scan_images_parallel(
+                    [uploaded_file.getvalue() for uploaded_file in uploaded_files]
+                )
+                scan_ids = iter(db.save_scans_bulk([
+                    row
+                    for uploaded_file, results in zip(uploaded_files, batch_results)
+                    for row in _scan_rows(uploaded_file, results)
+                ]))
+                batch = [
+                    (results, [next(scan_ids) for _ in results])
+                    for results in batch_results
+                ]
+        
+        for file_idx, uploaded_file in enumerate(uploaded_files):
             with st.expander(f"📄 {uploaded_file.name}", expanded=True):
                 col1, col2 = st.columns([2, 1])
                 
+                # Raw file bytes, shared by the preview and the scanner
+                data = uploaded_file.getvalue()
+                
                 with col1:
-                    # Display image
-                    image = Image.open(uploaded_file)
-                    st.image(image, caption=f"Size: {image.size[0]}x{image.size[1]}px", 
-                            use_column_width=True)
+                    # Display image (opening only reads the header for the size)
+                    from PIL import Image
+                    width, height = Image.open(io.BytesIO(data)).size
+                    st.image(data, caption=f"Size: {width}x{height}px", 
+                            width="stretch")
                 
                 with col2:
                     # File info
@@ -625,80 +1332,80 @@ def show_scan_page(db):
                     if st.button(f"🔍 Scan {uploaded_file.name}", key=f"scan_{uploaded_file.name}"):
                         with st.spinner("Scanning..."):
                             # Scan for QR codes
-                            results = scan_qr_from_image(image)
+                            results = scan_qr_from_image(load_image_gray(data))
                             
-                            if results:
-                                st.success(f"✅ Found {len(results)} QR code(s)")
+                            # Save all codes from this image at once
+                            scan_ids = db.save_scans_bulk(
+                                _scan_rows(uploaded_file, results)
+                            )
+                    elif batch is not None:
+                        results, scan_ids = batch[file_idx]
+                    else:
+                        continue
+                    
+                    if results:
+                        st.success(f"✅ Found {len(results)} QR code(s)")
+                        
+                        for i, (result, scan_id) in enumerate(zip(results, scan_ids)):
+                            key = f"{file_idx}_{i}"
+                            
+                            # Display result
+                            with st.container():
+                                badge_class = f"badge-{result['type']}"
+                                st.markdown(f'<span class="badge {badge_class}">{result["type"].upper()}</span>', 
+                                           unsafe_allow_html=True)
+                                
+                                # Display based on type
+                                if result['type'] == 'wifi':
+                                    wifi_info = parse_wifi_string(result['data'])
+                                    st.write(f"**WiFi:** {wifi_info['ssid']}")
+                                    if wifi_info['password']:
+                                        st.write(f"**Password:** `{wifi_info['password']}`")
+                                elif result['type'] == 'url':
+                                    st.markdown(f"[{result['data']}]({result['data']})")
+                                else:
+                                    st.text_area("Content", result['data'], 
+                                                height=100, key=f"content_{key}")
                                 
-                                for i, result in enumerate(results):
-                                    # Save to database
-                                    scan_id = db.save_scan(
-                                        filename=uploaded_file.name,
-                                        qr_data=result['data'],
-                                        qr_type=result['type'],
-                                        file_size_kb=file_size_kb,
-                                        file_format=uploaded_file.type
-                                    )
-                                    
-                                    # Display result
-                                    with st.container():
-                                        badge_class = f"badge-{result['type']}"
-                                        st.markdown(f'<span class="badge {badge_class}">{result["type"].upper()}</span>', 
-                                                   unsafe_allow_html=True)
-                                        
-                                        # Display based on type
-                                        if result['type'] == 'wifi':
-                                            wifi_info = parse_wifi_string(result['data'])
-                                            st.write(f"**WiFi:** {wifi_info['ssid']}")
-                                            if wifi_info['password']:
-                                                st.write(f"**Password:** `{wifi_info['password']}`")
-                                        elif result['type'] == 'url':
-                                            st.markdown(f"[{result['data']}]({result['data']})")
-                                        else:
-                                            st.text_area("Content", result['data'], 
-                                                        height=100, key=f"content_{i}")
-                                        
-                                        # Actions
-                                        col_a, col_b, col_c = st.columns(3)
-                                        with col_a:
-                                            if st.button("📋 Copy", key=f"copy_{i}"):
-                                                st.toast("Copied to clipboard!")
-                                        with col_b:
-                                            if st.button("⭐ Favorite", key=f"fav_{i}"):
-                                                db.toggle_favorite(scan_id)
-                                                st.toast("Added to favorites!")
-                                        with col_c:
-                                            if st.button("🗑️ Delete", key=f"del_{i}"):
-                                                db.delete_scan(scan_id)
-                                                st.rerun()
-                                        
-                                        st.markdown("---")
+                                # Actions
+                                col_a, col_b, col_c = st.columns(3)
+                                with col_a:
+                                    if st.button("📋 Copy", key=f"copy_{key}"):
+                                        st.toast("Copied to clipboard!")
+                                with col_b:
+                                    if st.button("⭐ Favorite", key=f"fav_{key}"):
+                                        db.toggle_favorite(scan_id)
+                                        st.toast("Added to favorites!")
+                                with col_c:
+                                    if st.button("🗑️ Delete", key=f"del_{key}"):
+                                        db.delete_scan(scan_id)
+                                        st.rerun()
                                 
-                                total_found += len(results)
-                            else:
-                                st.warning("❌ No QR codes found")
+                                st.markdown("---")
+                        
+                        total_found += len(results)
+                    else:
+                        st.warning("❌ No QR codes found")
         
         if total_found > 0:
             st.success(f"🎯 Total: Found {total_found} QR code(s) across {len(uploaded_files)} image(s)")
             
-            # Export options
+            # Export options (built only when a download is clicked)
             st.markdown("### 💾 Export All Scans")
             export_col1, export_col2 = st.columns(2)
             
             with export_col1:
-                csv_data = db.export_to_csv()
                 st.download_button(
                     label="📥 Download CSV",
-                    data=csv_data,
+                    data=lambda: b"".join(db.stream_csv()),
                     file_name="qr_scans.csv",
                     mime="text/csv"
                 )
             
             with export_col2:
-                json_data = db.export_to_json()
                 st.download_button(
                     label="📥 Download JSON",
-                    data=json_data,
+                    data=lambda: b"".join(db.stream_json()),
                     file_name="qr_scans.json",
                     mime="application/json"
                 )
@@ -726,6 +1433,7 @@ def show_dashboard_page(db):
     # Type distribution
     st.subheader("📈 Scan Type Distribution")
     if stats['by_type']:
+        import pandas as pd
         type_df = pd.DataFrame({
             'Type': list(stats['by_type'].keys()),
             'Count': list(stats['by_type'].values())
@@ -765,6 +1473,74 @@ def show_dashboard_page(db):
     else:
         st.info("No scans yet. Upload some images!")
 
+@st.fragment
+def _scan_row(db, scan, qr_data: str):
+    """Render one Browse page scan; its buttons only rerun this fragment"""
+    with st.expander(f"{scan['filename']} - {scan['qr_type'].upper()} - {scan['scan_date']}", 
+                   expanded=False):
+        
+        # Scan info
+        col1, col2 = st.columns([3, 1])
+        
+        with col1:
+            badge_class = f"badge-{scan['qr_type']}"
+            st.markdown(f'<span class="badge {badge_class}">{scan["qr_type"].upper()}</span>', 
+                       unsafe_allow_html=True)
+            
+            # Display content based on type
+            if scan['qr_type'] == 'wifi':
+                wifi_info = parse_wifi_string(qr_data)
+                st.write(f"**SSID:** {wifi_info['ssid']}")
+                if wifi_info['password']:
+                    st.write(f"**Password:** `{wifi_info['password']}`")
+            elif scan['qr_type'] == 'url':
+                st.markdown(f"[{qr_data}]({qr_data})")
+            else:
+                st.text_area("Content", qr_data, height=150)
+        
+        with col2:
+            # Actions
+            if st.button("📋 Copy", key=f"copy_{scan['id']}"):
+                st.toast("Copied to clipboard!")
+            
+            fav_status = "★" if scan['is_favorite'] else "☆"
+            if st.button(f"{fav_status} Favorite", key=f"fav_{scan['id']}"):
+                db.toggle_favorite(scan['id'])
+                st.rerun()
+            
+            if st.button("🗑️ Delete", key=f"delete_{scan['id']}"):
+                db.delete_scan(scan['id'])
+                st.rerun()
+            
+            # segno raises DataOverflowError for payloads over QR capacity
+            qr_fits = _qr_fits(qr_data)
+            
+            # Generate QR button (preview only)
+            if st.button("🔄 Generate QR", key=f"gen_{scan['id']}"):
+                if not qr_fits:
+                    st.warning("⚠️ Too much data to fit in a QR code")
+                elif len(qr_data) <= CLIENT_QR_MAX_LEN:
+                    # Small payloads are drawn by the browser
+                    _render_qr_client(qr_data)
+                    st.caption("Generated QR Code")
+                else:
+                    # A file-like PNG is served from Streamlit's media
+                    # endpoint instead of being inlined into the page
+                    st.image(io.BytesIO(generate_qr_code(qr_data)), 
+                             caption="Generated QR Code", output_format="PNG")
+            
+            # The PNG is only built when the download is clicked, where
+            # warnings can't be shown, so oversized payloads disable it
+            st.download_button(
+                label="📥 Download QR",
+                data=lambda d=qr_data: generate_qr_code(d),
+                file_name=f"qr_{scan['id']}.png",
+                mime="image/png",
+                key=f"dl_{scan['id']}",
+                disabled=not qr_fits,
+                help=None if qr_fits else "Too much data to fit in a QR code"
+            )
+
 def show_browse_page(db):
     """Show browse and search page"""
     st.title("🔍 Browse Scans")
@@ -786,69 +1562,66 @@ def show_browse_page(db):
         show_favorites = st.checkbox("⭐ Favorites only")
     
     # Get scans based on filters
-    if search_query:
-        scans = db.search_scans(search_query)
-    elif filter_type != "All":
-        scans = db.get_scans_by_type(filter_type)
-    elif show_favorites:
-        scans = db.get_favorites()
-    else:
-        scans = db.get_all_scans(limit=50)
+    scans = _query_scans(db, db.db_path, 
+                         (search_query, filter_type, show_favorites),
+                         st.session_state.per_page)
     
     # Display scans
     if scans:
         st.info(f"Found {len(scans)} scan(s)")
         
+        # List queries only carry a preview; load the full payloads of the
+        # listed scans at once. Scans deleted since the list was cached
+        # have no payload and are skipped.
+        payloads = db.get_scan_payloads([scan['id'] for scan in scans])
         for scan in scans:
-            with st.expander(f"{scan['filename']} - {scan['qr_type'].upper()} - {scan['scan_date']}", 
-                           expanded=False):
-                
-                # Scan info
-                col1, col2 = st.columns([3, 1])
-                
-                with col1:
-                    badge_class = f"badge-{scan['qr_type']}"
-                    st.markdown(f'<span class="badge {badge_class}">{scan["qr_type"].upper()}</span>', 
-                               unsafe_allow_html=True)
-                    
-                    # Display content based on type
-                    if scan['qr_type'] == 'wifi':
-                        wifi_info = parse_wifi_string(scan['qr_data'])
-                        st.write(f"**SSID:** {wifi_info['ssid']}")
-                        if wifi_info['password']:
-                            st.write(f"**Password:** `{wifi_info['password']}`")
-                    elif scan['qr_type'] == 'url':
-                        st.markdown(f"[{scan['qr_data']}]({scan['qr_data']})")
-                    else:
-                        st.text_area("Content", scan['qr_data'], height=150)
-                
-                with col2:
-                    # Actions
-                    if st.button("📋 Copy", key=f"copy_{scan['id']}"):
-                        st.toast("Copied to clipboard!")
-                    
-                    fav_status = "★" if scan['is_favorite'] else "☆"
-                    if st.button(f"{fav_status} Favorite", key=f"fav_{scan['id']}"):
-                        db.toggle_favorite(scan['id'])
-                        st.rerun()
-                    
-                    if st.button("🗑️ Delete", key=f"delete_{scan['id']}"):
-                        db.delete_scan(scan['id'])
-                        st.rerun()
-                    
-                    # Generate QR button
-                    if st.button("🔄 Generate QR", key=f"gen_{scan['id']}"):
-                        qr_img = generate_qr_code(scan['qr_data'])
-                        st.image(qr_img, caption="Generated QR Code")
-                        st.download_button(
-                            label="📥 Download QR",
-                            data=qr_img,
-                            file_name=f"qr_{scan['id']}.png",
-                            mime="image/png"
-                        )
+            if scan['id'] in payloads:
+                _scan_row(db, scan, payloads[scan['id']])
     else:
         st.info("No scans found. Try different filters or upload some images!")
 
+def _clear_all(db):
+    """Delete every scan; on_scans_changed drops the cached scan lists"""
+    db.clear_all()
+
+def _close_confirm_delete():
+    """Hide the clear-all confirmation and untick its checkbox"""
+    st.session_state.confirm_delete = False
+    st.session_state.pop('confirm_delete_ack', None)
+
+@st.fragment
+def _danger_zone(db):
+    """Clear-all controls; the confirmation state survives reruns"""
+    st.warning("⚠️ Dangerous Zone")
+    
+    if st.session_state.pop('scans_cleared', False):
+        st.success("All scans deleted!")
+    
+    if st.button("🗑️ Clear All Scans", type="secondary"):
+        st.session_state.confirm_delete = True
+    
+    if st.session_state.confirm_delete:
+        confirmed = st.checkbox("I understand this will delete ALL scans permanently",
+                                key="confirm_delete_ack")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Confirm Delete", type="primary", disabled=not confirmed):
+                _clear_all(db)
+                _close_confirm_delete()
+                st.session_state.scans_cleared = True
+                
+                # Full rerun so the sidebar totals drop to zero as well
+                st.rerun()
+        with col2:
+            st.button("Cancel", on_click=_close_confirm_delete)
+
+def _save_settings(db, keys: List[str]):
+    """Persist the current values of the given settings widgets"""
+    values = {key: st.session_state[key] for key in keys}
+    db.save_settings(values)
+    st.session_state.settings.update(values)
+
 def show_settings_page(db):
     """Show settings page"""
     st.title("⚙️ Settings")
@@ -858,52 +1631,43 @@ def show_settings_page(db):
     with tab1:
         st.subheader("Database Settings")
         
-        # Backup database
-        if st.button("💾 Backup Database"):
-            csv_data = db.export_to_csv()
-            st.download_button(
-                label="📥 Download Backup (CSV)",
-                data=csv_data,
-                file_name="qrscan_backup.csv",
-                mime="text/csv"
-            )
+        # Backup database (the CSV is only built when the download is clicked)
+        st.download_button(
+            label="💾 Backup Database (CSV)",
+            data=lambda: b"".join(db.stream_csv()),
+            file_name="qrscan_backup.csv",
+            mime="text/csv"
+        )
         
         # Clear database
         st.markdown("---")
-        st.warning("⚠️ Dangerous Zone")
-        
-        if st.button("🗑️ Clear All Scans", type="secondary"):
-            if st.checkbox("I understand this will delete ALL scans permanently"):
-                if st.button("Confirm Delete", type="primary"):
-                    with db.get_connection() as conn:
-                        cursor = conn.cursor()
-                        cursor.execute("DELETE FROM scans")
-                        cursor.execute("DELETE FROM daily_stats")
-                    st.success("All scans deleted!")
-                    st.rerun()
+        _danger_zone(db)
     
     with tab2:
         st.subheader("Scanning Settings")
         
         # Detection settings
-        st.checkbox("Use enhanced detection", value=True, 
+        st.checkbox("Use enhanced detection", key="use_enhanced_detection",
                    help="Apply image processing for better detection")
-        st.checkbox("Auto-rotate images", value=True)
-        st.checkbox("Remove image noise", value=True)
+        st.checkbox("Auto-rotate images", key="auto_rotate")
+        st.checkbox("Remove image noise", key="denoise")
         
-        st.slider("Detection confidence", 0.1, 1.0, 0.7, 0.1,
+        st.slider("Detection confidence", 0.1, 1.0, step=0.1, key="conf",
                  help="Higher values = stricter detection")
         
         if st.button("💾 Save Scanning Settings"):
+            _save_settings(db, ["use_enhanced_detection", "auto_rotate",
+                                "denoise", "conf"])
             st.success("Settings saved!")
     
     with tab3:
         st.subheader("Appearance")
         
-        theme = st.selectbox("Theme", ["Light", "Dark", "Auto"])
-        results_per_page = st.slider("Results per page", 10, 100, 25)
+        st.selectbox("Theme", ["Light", "Dark", "Auto"], key="theme")
+        st.slider("Results per page", 10, 100, key="per_page")
         
         if st.button("💾 Save Appearance Settings"):
+            _save_settings(db, ["theme", "per_page"])
             st.success("Settings saved!")
 
 # Run the app